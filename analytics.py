@@ -0,0 +1,256 @@
+"""
+分时流量与等待分析
+基于列式观众数据（{列名: numpy数组}，也可直接传入观众 DataFrame），
+一次性构建 阶段 × 时间段 × 分组（大棚/路径/下行方式）的统计立方体：进入人数、通过人数、平均排队时长及排队时长分位数。
+全部计算均为 np.bincount 与排序分组，不使用逐行循环，可在 1 秒粒度下对百万级观众交互式重算。
+"""
+import numpy as np
+
+import config as cfg
+
+# 各阶段对应的列：进入排队时间、离开该阶段时间、排队时长。时间为 -1 表示尚未到达该节点
+STAGES = {
+    "安检": {"start": "安检排队开始时间", "end": "安检完成时间", "wait": "安检排队时长"},
+    "下行": {"start": "下楼排队开始时间", "end": "完成进站时间", "wait": "下楼排队时长"},
+}
+
+# 可选的分组维度；None 表示不分组（全部观众）。"闸口" 仅在多闸口场馆结果中存在，缺失的维度会被跳过
+DIMENSIONS = (None, "闸口", "安检大棚", "入口路径", "下行方式")
+ALL_GROUP_LABEL = "全部"
+# 尚未到达该节点的观众（大棚/下行方式为空字符串）单独归入此分组，保证各分组之和等于"全部"
+UNREACHED_GROUP_LABEL = "未到达"
+
+
+def _factorize(values):
+    """把类别列转换为 (已排序的分组标签, 每行的分组编号)。
+    类别数很少（大棚/路径/下行方式），逐类别做向量化比较比对整列字符串排序快得多"""
+    values = np.asarray(values)
+    codes = np.full(len(values), -1, dtype=np.intp)
+    labels = []
+    while True:
+        unassigned = np.flatnonzero(codes < 0)
+        if unassigned.size == 0:
+            break
+        label = values[unassigned[0]]
+        codes[unassigned[values[unassigned] == label]] = len(labels)
+        labels.append(label)
+
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    remap = np.empty(len(order), dtype=np.intp)
+    remap[order] = np.arange(len(order))
+    return labels[order], remap[codes]
+
+
+def _time_bins(times, bin_s, n_bins):
+    return np.minimum((times // bin_s).astype(np.intp), n_bins - 1)
+
+
+def _stable_order(keys, n_keys, within=None):
+    """按整数 keys 做稳定排序（可先给定组内顺序 within）。
+    keys 取值范围较小时转换为 uint8/uint16，numpy 会对其使用基数排序"""
+    if n_keys <= np.iinfo(np.uint8).max + 1:
+        keys = keys.astype(np.uint8)
+    elif n_keys <= np.iinfo(np.uint16).max + 1:
+        keys = keys.astype(np.uint16)
+    if within is None:
+        return np.argsort(keys, kind="stable")
+    return within[np.argsort(keys[within], kind="stable")]
+
+
+def _prepare_stage(spectator_cols, columns, n_rows, bin_s, n_bins):
+    """提取某阶段与分组维度无关的部分：时间段编号、排队时长及其排序，供各维度复用"""
+    if n_rows:
+        start = np.asarray(spectator_cols[columns["start"]], dtype=float)
+        end = np.asarray(spectator_cols[columns["end"]], dtype=float)
+        wait = np.asarray(spectator_cols[columns["wait"]], dtype=float)
+    else:
+        start = end = wait = np.zeros(0)
+
+    entered = start >= 0
+    left = end >= 0
+    wait_values = wait[left]
+    # 已离开该阶段者的排队时长已确定，按其开始排队的时间段归组
+    wait_bins = _time_bins(start[left], bin_s, n_bins)
+    return {
+        "entered": entered,
+        "left": left,
+        "arrival_bins": _time_bins(start[entered], bin_s, n_bins),
+        "exit_bins": _time_bins(end[left], bin_s, n_bins),
+        "wait_bins": wait_bins,
+        "wait_values": wait_values,
+        # 按 (时间段, 排队时长) 排好的顺序，各维度只需再按分组编号做一次稳定排序
+        "wait_order": _stable_order(wait_bins, n_bins, np.argsort(wait_values)),
+    }
+
+
+def _grouped_quantiles(keys, codes, n_groups, prepared, n_cells, quantiles):
+    """按 keys（分组编号 × 时间段）计算排队时长的分位数（线性插值），空单元格为 NaN。
+    返回 {q: 数组[n_cells]}"""
+    order = _stable_order(codes, n_groups, prepared["wait_order"])
+    sorted_values = prepared["wait_values"][order]
+    counts = np.bincount(keys, minlength=n_cells)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    non_empty = counts > 0
+
+    result = {}
+    for q in quantiles:
+        out = np.full(n_cells, np.nan)
+        position = offsets[non_empty] + q * (counts[non_empty] - 1)
+        lower = np.floor(position).astype(np.intp)
+        upper = np.ceil(position).astype(np.intp)
+        fraction = position - lower
+        out[non_empty] = sorted_values[lower] * (1 - fraction) + sorted_values[upper] * fraction
+        result[q] = out
+    return result
+
+
+def _stage_cube(codes, n_groups, n_bins, prepared, quantiles):
+    n_cells = n_groups * n_bins
+    arrival_keys = codes[prepared["entered"]] * n_bins + prepared["arrival_bins"]
+    exit_keys = codes[prepared["left"]] * n_bins + prepared["exit_bins"]
+    wait_codes = codes[prepared["left"]]
+    wait_keys = wait_codes * n_bins + prepared["wait_bins"]
+
+    arrivals = np.bincount(arrival_keys, minlength=n_cells)
+    throughput = np.bincount(exit_keys, minlength=n_cells)
+    wait_counts = np.bincount(wait_keys, minlength=n_cells)
+    wait_sums = np.bincount(wait_keys, weights=prepared["wait_values"], minlength=n_cells)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_wait = np.where(wait_counts > 0, wait_sums / np.maximum(wait_counts, 1), np.nan)
+
+    stage_quantiles = _grouped_quantiles(wait_keys, wait_codes, n_groups, prepared, n_cells, quantiles)
+    return {
+        "arrivals": arrivals.reshape(n_groups, n_bins),
+        "throughput": throughput.reshape(n_groups, n_bins),
+        "mean_wait": mean_wait.reshape(n_groups, n_bins),
+        "quantiles": {q: values.reshape(n_groups, n_bins) for q, values in stage_quantiles.items()},
+    }
+
+
+def build_flow_cubes(spectator_cols, dimensions=DIMENSIONS, bin_s=None, duration_s=None, quantiles=None):
+    """
+    对多个分组维度构建分时流量与等待立方体，返回 {维度: 立方体}。
+    各阶段的时间段编号和排队时长排序只计算一次，由所有维度共享。
+
+    每个立方体为字典:
+        "dimension": 分组维度列名（None 为全部）
+        "groups":    分组标签数组，长度 G
+        "bin_edges": 时间段左边界（秒），长度 T
+        "stages":    {阶段名: {"arrivals", "throughput", "mean_wait", "quantiles": {q: ...}}}
+                     其中每个数组形状均为 (G, T)。
+                     arrivals:   该时间段内开始排队的人数
+                     throughput: 该时间段内完成该阶段的人数
+                     mean_wait / quantiles: 该时间段内开始排队、且已结束排队者的排队时长（秒）
+    """
+    bin_s = cfg.FLOW_CUBE_BIN_S if bin_s is None else bin_s
+    duration_s = cfg.SIMULATION_DURATION_SECONDS if duration_s is None else duration_s
+    quantiles = cfg.FLOW_CUBE_QUANTILES if quantiles is None else quantiles
+    n_bins = max(1, int(np.ceil(duration_s / bin_s)))
+
+    first_column = STAGES["安检"]["start"]
+    n_rows = len(spectator_cols[first_column]) if first_column in spectator_cols else 0
+    prepared = {
+        stage: _prepare_stage(spectator_cols, columns, n_rows, bin_s, n_bins)
+        for stage, columns in STAGES.items()
+    }
+
+    cubes = {}
+    for dimension in dimensions:
+        if dimension is not None and n_rows and dimension not in spectator_cols:
+            continue
+        if dimension is None or not n_rows:
+            groups, codes = np.array([ALL_GROUP_LABEL]), np.zeros(n_rows, dtype=np.intp)
+        else:
+            values = np.asarray(spectator_cols[dimension])
+            if values.dtype.kind in "UO":
+                values = np.where(values == "", UNREACHED_GROUP_LABEL, values)
+            groups, codes = _factorize(values)
+        cubes[dimension] = {
+            "dimension": dimension,
+            "groups": groups,
+            "bin_edges": np.arange(n_bins) * bin_s,
+            "stages": {
+                stage: _stage_cube(codes, len(groups), n_bins, stage_prepared, quantiles)
+                for stage, stage_prepared in prepared.items()
+            },
+        }
+    return cubes
+
+
+def build_flow_cube(spectator_cols, dimension=None, bin_s=None, duration_s=None, quantiles=None):
+    """构建单一分组维度的立方体，结构见 build_flow_cubes"""
+    return build_flow_cubes(spectator_cols, (dimension,), bin_s, duration_s, quantiles)[dimension]
+
+
+def flow_cubes_to_frame(cubes):
+    """把立方体展开为长表 DataFrame，便于写入 Excel"""
+    import pandas as pd
+
+    frames = []
+    for cube in cubes.values():
+        n_groups, n_bins = len(cube["groups"]), len(cube["bin_edges"])
+        dimension_label = cube["dimension"] or ALL_GROUP_LABEL
+        for stage, data in cube["stages"].items():
+            frame = {
+                "阶段": stage,
+                "分组维度": dimension_label,
+                "分组": np.repeat(cube["groups"], n_bins),
+                "时间段开始(s)": np.tile(cube["bin_edges"], n_groups),
+                "开始排队人数": data["arrivals"].ravel(),
+                "完成人数": data["throughput"].ravel(),
+                "平均排队时长(s)": data["mean_wait"].ravel(),
+            }
+            for q, values in data["quantiles"].items():
+                frame[f"排队时长P{q * 100:g}(s)"] = values.ravel()
+            frames.append(pd.DataFrame(frame))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def compute_kpis(spectator_cols, system_cols):
+    """
+    计算机器可读的核心 KPI（纯 numpy，不依赖 pandas），口径与 main.create_summary 一致。
+    输入为 {列名: 数组}，可直接使用 Simulation.get_columns() 或 RunStore.open_run() 的结果。
+    时间类指标单位为分钟，比例类指标为 0-1 或百分数（见键名后缀）。
+    """
+    def column(cols, name):
+        return np.asarray(cols[name]) if name in cols else np.zeros(0)
+
+    def mean(values):
+        return float(values.mean()) if values.size else 0.0
+
+    def quantile(values, q):
+        return float(np.quantile(values, q)) if values.size else 0.0
+
+    def maximum(values):
+        return float(values.max()) if values.size else 0.0
+
+    finished = column(spectator_cols, "是否在规定时间内完成").astype(bool)
+    total_finished = int(finished.sum())
+    total_time = column(spectator_cols, "总耗时")[finished]
+    security_wait = column(spectator_cols, "安检排队时长")[finished]
+    descend_wait = column(spectator_cols, "下楼排队时长")[finished]
+    descend_method = column(spectator_cols, "下行方式")[finished]
+
+    north_busy = column(system_cols, "北侧安检区使用中通道数")
+    south_busy = column(system_cols, "南侧安检区使用中通道数")
+    lane_utilization = mean(north_busy + south_busy) / cfg.TOTAL_SECURITY_LANES * 100 if north_busy.size else 0.0
+
+    return {
+        "spectators": int(len(column(spectator_cols, "ID"))),
+        "finished": total_finished,
+        "completion_rate": total_finished / cfg.TOTAL_SPECTATORS if cfg.TOTAL_SPECTATORS > 0 else 0.0,
+        "avg_total_time_min": mean(total_time) / 60,
+        "p95_total_time_min": quantile(total_time, 0.95) / 60,
+        "avg_security_queue_min": mean(security_wait) / 60,
+        "p95_security_queue_min": quantile(security_wait, 0.95) / 60,
+        "avg_descend_queue_min": mean(descend_wait) / 60,
+        "north_max_queue": maximum(column(system_cols, "北侧安检队列总人数")),
+        "south_max_queue": maximum(column(system_cols, "南侧安检队列总人数")),
+        "escalator_max_queue": maximum(column(system_cols, "电梯队列人数")),
+        "security_lane_utilization_pct": lane_utilization,
+        "escalator_utilization_pct": mean(column(system_cols, "电梯使用中人数")) / cfg.ESCALATOR_PHYSICAL_CAPACITY * 100,
+        "escalator_share_pct": float((descend_method == "escalator").sum()) / total_finished * 100 if total_finished else 0.0,
+    }
@@ -0,0 +1,199 @@
+"""
+无界面批量运行入口
+支持命令行/配置文件覆盖参数、选择仿真引擎、多次重复运行与多进程并行，
+并以 JSON / JSONL 输出机器可读的 KPI。pandas 与 openpyxl 仅在需要表格或 Excel 输出时才导入。
+
+示例:
+    python cli.py --set TOTAL_SPECTATORS=500 --set SIMULATION_DURATION_HOURS=0.5
+    python cli.py --config scenario.json --replications 20 --workers 8 --format jsonl
+    python cli.py --format table --excel outputs/simulation_results.xlsx
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+
+import config as cfg
+from analytics import compute_kpis
+
+# 可选的仿真引擎：名称 -> "模块:类"，在运行时才导入
+ENGINES = {
+    "simpy": "simulation:Simulation",
+    "venue": "venue:Venue",
+}
+
+
+def load_engine(name):
+    module_name, class_name = ENGINES[name].split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def load_config_file(path):
+    """读取 JSON 或 YAML 格式的参数覆盖文件，内容为 {参数名: 值}"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("读取 YAML 配置需要安装 PyYAML: pip install pyyaml")
+            overrides = yaml.safe_load(f) or {}
+        else:
+            overrides = json.load(f)
+    if not isinstance(overrides, dict):
+        raise SystemExit(f"配置文件 {path} 的内容必须是 {{参数名: 值}} 映射")
+    return overrides
+
+
+def parse_set_option(item):
+    """解析 --set NAME=VALUE，VALUE 按 JSON 解析，失败时作为字符串"""
+    name, sep, raw = item.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"参数覆盖格式应为 NAME=VALUE: {item}")
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError:
+        value = raw
+    return name.strip(), value
+
+
+def run_kpis(engine, seed, overrides):
+    """在当前进程（或工作进程）中运行一次仿真，只返回 KPI 字典"""
+    cfg.apply_overrides(overrides)
+    sim = load_engine(engine)(seed=seed, verbose=False)
+    sim.run()
+    return sim.get_kpis()
+
+
+def run_batch(args, overrides):
+    """按参数运行所有重复，返回每次运行的记录列表 [{"run_id", "seed", ...KPI}]"""
+    base_seed = cfg.RANDOM_SEED if args.seed is None else args.seed
+    seeds = [base_seed + i for i in range(args.replications)]
+    run_ids = [f"{args.run_prefix}_{i:04d}" for i in range(args.replications)]
+
+    if args.store:
+        # 工作进程把结果写入结果库，只回传 run_id，KPI 从内存映射的列计算
+        from run_store import RunStore, run_replications
+
+        store = RunStore(args.store)
+        run_ids = run_replications(
+            args.replications, store.root, args.workers, base_seed, overrides, verbose=False,
+            prefix=args.run_prefix, overwrite=args.overwrite,
+        )
+        kpis = [compute_kpis(store.open_run(run_id), store.open_run(run_id, table="system")) for run_id in run_ids]
+    elif args.workers == 1:
+        kpis = [run_kpis(args.engine, seed, overrides) for seed in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(run_kpis, args.engine, seed, overrides) for seed in seeds]
+            kpis = [future.result() for future in futures]
+
+    return [{"run_id": run_id, "seed": seed, **run_kpi} for run_id, seed, run_kpi in zip(run_ids, seeds, kpis)]
+
+
+def write_excel_report(args, overrides):
+    """单次运行并生成完整 Excel 报告（需要 pandas/openpyxl），返回该次运行的记录"""
+    from main import write_excel
+
+    seed = cfg.RANDOM_SEED if args.seed is None else args.seed
+    sim = load_engine(args.engine)(seed=seed, verbose=False)
+    sim.run()
+    spectator_df, system_df = sim.get_results()
+    write_excel(spectator_df, system_df, args.excel)
+    return [{"run_id": "run_0000", "seed": seed, **sim.get_kpis()}]
+
+
+def format_output(args, overrides, records, elapsed_s):
+    if args.format == "jsonl":
+        return "\n".join(json.dumps(record, ensure_ascii=False) for record in records)
+
+    if args.format == "table":
+        import pandas as pd
+
+        # 表格只展示标量 KPI（如场馆引擎的各闸口明细请使用 JSON 输出）
+        rows = [{name: value for name, value in record.items() if not isinstance(value, dict)} for record in records]
+        return pd.DataFrame(rows).set_index("run_id").T.to_string()
+
+    kpi_names = [
+        name for name, value in records[0].items()
+        if name not in ("run_id", "seed") and isinstance(value, (int, float))
+    ] if records else []
+    result = {
+        "engine": args.engine,
+        "replications": len(records),
+        "overrides": overrides,
+        "elapsed_s": elapsed_s,
+        "runs": records,
+        "mean": {name: sum(record[name] for record in records) / len(records) for name in kpi_names},
+    }
+    return json.dumps(result, ensure_ascii=False, indent=2)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="安检口压力测试仿真 - 批量运行")
+    parser.add_argument("--config", action="append", default=[], metavar="FILE",
+                        help="JSON/YAML 参数覆盖文件，可多次指定，后者覆盖前者")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], type=parse_set_option,
+                        metavar="NAME=VALUE", help="覆盖单个 config 参数，VALUE 按 JSON 解析，优先于 --config")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="simpy", help="仿真引擎")
+    parser.add_argument("--replications", type=int, default=1, help="重复运行次数，第 i 次的种子为 seed + i")
+    parser.add_argument("--workers", type=int, default=None, help="并行工作进程数，默认 min(重复次数, CPU 核数)")
+    parser.add_argument("--seed", type=int, default=None, help="基础随机种子，默认为 config.RANDOM_SEED")
+    parser.add_argument("--format", choices=["json", "jsonl", "table"], default="json", help="KPI 输出格式")
+    parser.add_argument("--output", metavar="FILE", help="KPI 输出文件，默认输出到标准输出")
+    parser.add_argument("--excel", metavar="FILE", help="同时写出完整 Excel 报告（仅限 simpy 引擎的单次运行）")
+    parser.add_argument("--store", metavar="DIR", help="把每次运行的列式结果写入该结果库目录")
+    parser.add_argument("--run-prefix", default="run", help="结果库中 run_id 的前缀，不同扫描点应使用不同前缀")
+    parser.add_argument("--overwrite", action="store_true", help="允许覆盖结果库中已存在的同名运行")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.replications < 1:
+        parser.error("--replications 必须 >= 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers 必须 >= 1")
+    if args.excel and (args.replications > 1 or args.store):
+        parser.error("--excel 仅支持单次运行，且不能与 --store 同时使用")
+    if args.excel and args.engine != "simpy":
+        # 汇总表按单一闸口的通道数/扶梯容量计算利用率，各闸口参数不同时结果不正确
+        parser.error("--excel 目前仅支持 simpy 引擎，场馆引擎请使用 JSON 输出中各闸口的 KPI")
+    if args.store and args.engine != "simpy":
+        parser.error("--store 目前仅支持 simpy 引擎")
+    if args.workers is None:
+        args.workers = min(args.replications, os.cpu_count() or 1)
+
+    overrides = {}
+    for path in args.config:
+        overrides.update(load_config_file(path))
+    overrides.update(dict(args.overrides))
+    try:
+        cfg.apply_overrides(overrides)
+        if args.engine == "venue":
+            # 各闸口的覆盖参数和 share 在启动工作进程之前检查
+            from venue import validate_gates
+            validate_gates()
+    except (KeyError, ValueError) as e:
+        parser.error(e.args[0])
+
+    start = time.perf_counter()
+    try:
+        records = write_excel_report(args, overrides) if args.excel else run_batch(args, overrides)
+    except FileExistsError as e:
+        parser.error(f"{e.args[0]}（命令行中使用 --run-prefix 或 --overwrite）")
+    elapsed_s = time.perf_counter() - start
+
+    text = format_output(args, overrides, records, elapsed_s)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
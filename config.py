@@ -129,6 +129,11 @@ STAIRS_PERSON_CROSS_TIME_S = 60 / STAIRS_TOTAL_THROUGHPUT_PPM # 单人通过楼
 # ==============================================================================
 OUTPUT_FILE_NAME = "outputs/simulation_results.xlsx"
 MONITOR_INTERVAL_S = 60  # 每隔60秒记录一次系统状态
+# 多次重复/参数扫描的结果库目录：每次运行按列写入 .npy 文件并附带 manifest.json
+RUN_STORE_DIR = "outputs/runs"
+# 分时流量与等待立方体：时间段粒度（秒）及排队时长分位数
+FLOW_CUBE_BIN_S = 60
+FLOW_CUBE_QUANTILES = (0.5, 0.95)
 
 # ==============================================================================
 # 7. 日志和调试 (Logging and Debugging)
@@ -173,4 +178,68 @@ PATH_CHOICE_PROBS = {
 CONGESTION_DENSITY_THRESHOLD = 0.5  # 触发拥挤降速的密度阈值 (人/㎡)
 CONGESTION_SPEED_REDUCTION_UNIT_DENSITY = 0.1 # 密度每增加这么多
 CONGESTION_SPEED_REDUCTION_FACTOR = 0.1 # 速度就降低这个比例 (10%)
-MIN_WALKING_SPEED_MPS = 0.2 # 拥挤时最低步行速度，避免速度降为0 
\ No newline at end of file
+MIN_WALKING_SPEED_MPS = 0.2 # 拥挤时最低步行速度，避免速度降为0 
+
+
+# ============================================================================
+# 多闸口场馆模型 (Multi-Gate Venue)
+# ============================================================================
+# 各闸口及其参数。share 为到达观众被分配到该闸口的比例（闸口分配规则），
+# overrides 为该闸口相对本文件参数的覆盖（如通道数、路径、扶梯能力），格式同 apply_overrides。
+# 默认只有 F口，与单闸口模型等价。
+GATES = {
+    "F口": {"share": 1.0, "overrides": {}},
+}
+# 允许改道的闸口关系 {闸口: [可改道前往的闸口, ...]}；为空时各闸口完全独立并行运行
+GATE_REROUTE_LINKS = {}
+# 有改道关系时，各闸口进程每隔该时长交换一次排队状态（秒）
+GATE_EXCHANGE_INTERVAL_S = 5 * 60
+# 闸口安检排队人数 / 通道数 超过该阈值时，新到达的群组开始按概率改道
+GATE_REROUTE_LOAD_THRESHOLD = 5
+GATE_REROUTE_PROB = 0.3
+# 改道前往其他闸口的额外步行时间（秒）
+GATE_REROUTE_DELAY_S = 10 * 60
+# 闸口并行工作进程数，None 表示使用全部 CPU 核
+VENUE_WORKERS = None
+
+# ============================================================================
+# 参数覆盖 (Overrides)
+# ============================================================================
+def snapshot():
+    """当前全部大写参数的快照，可通过 apply_overrides(snapshot) 原样恢复"""
+    return {name: value for name, value in globals().items() if name.isupper()}
+
+
+def validate_overrides(overrides):
+    """检查覆盖参数名均为本文件中已存在的大写参数，否则抛出 KeyError"""
+    module = globals()
+    for name in overrides or {}:
+        if not name.isupper() or name not in module:
+            raise KeyError(f"未知的配置参数: {name}")
+
+
+def apply_overrides(overrides):
+    """
+    用 {参数名: 值} 覆盖本模块中的参数（供命令行和多进程重复运行使用），
+    并重新计算由其他参数派生出的参数。参数名必须是本文件中已存在的大写参数。
+    """
+    global SIMULATION_DURATION_SECONDS, TOTAL_SECURITY_LANES, ESCALATOR_CAPACITY_PER_SEC
+    global STAIRS_TOTAL_THROUGHPUT_PPM, STAIRS_PERSON_CROSS_TIME_S
+
+    overrides = overrides or {}
+    validate_overrides(overrides)
+    module = globals()
+    for name, value in overrides.items():
+        module[name] = value
+
+    # 派生参数：未被显式覆盖时按新的基础参数重新计算
+    if "SIMULATION_DURATION_SECONDS" not in overrides:
+        SIMULATION_DURATION_SECONDS = SIMULATION_DURATION_HOURS * 3600
+    if "TOTAL_SECURITY_LANES" not in overrides:
+        TOTAL_SECURITY_LANES = NUM_SECURITY_TENTS * LANES_PER_TENT
+    if "ESCALATOR_CAPACITY_PER_SEC" not in overrides:
+        ESCALATOR_CAPACITY_PER_SEC = ESCALATOR_CAPACITY_PER_MIN / 60
+    if "STAIRS_TOTAL_THROUGHPUT_PPM" not in overrides:
+        STAIRS_TOTAL_THROUGHPUT_PPM = STAIRS_THROUGHPUT_PPM_PER_METER * STAIRS_WIDTH_M
+    if "STAIRS_PERSON_CROSS_TIME_S" not in overrides:
+        STAIRS_PERSON_CROSS_TIME_S = 60 / STAIRS_TOTAL_THROUGHPUT_PPM
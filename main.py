@@ -6,6 +6,7 @@ import os
 import numpy as np
 
 from simulation import Simulation
+from analytics import build_flow_cubes, flow_cubes_to_frame
 import config as cfg
 
 def create_summary(spectator_df, system_df):
@@ -245,6 +246,27 @@ def create_summary(spectator_df, system_df):
     return pd.DataFrame(all_data)
 
 
+def write_excel(spectator_df, system_df, output_file_name):
+    """生成汇总报告和分时统计，并将所有数据写入一个Excel文件（每个DataFrame一个sheet）。返回汇总表"""
+    # 确保输出目录存在
+    output_dir = os.path.dirname(output_file_name)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    summary_df = create_summary(spectator_df, system_df)
+
+    # 分时流量与等待统计（阶段 × 时间段 × 大棚/路径/下行方式）
+    flow_df = flow_cubes_to_frame(build_flow_cubes(spectator_df))
+
+    with pd.ExcelWriter(output_file_name, engine='openpyxl') as writer:
+        summary_df.to_excel(writer, sheet_name='仿真结果汇总', index=False)
+        spectator_df.to_excel(writer, sheet_name='所有观众详细数据', index=False)
+        system_df.to_excel(writer, sheet_name='系统状态监控', index=False)
+        flow_df.to_excel(writer, sheet_name='分时流量与等待', index=False)
+
+    return summary_df
+
+
 def main():
     """主函数"""
     # 1. 初始化并运行仿真
@@ -254,17 +276,8 @@ def main():
     # 2. 获取结果
     spectator_df, system_df = sim.get_results()
 
-    # 确保输出目录存在
-    os.makedirs(os.path.dirname(cfg.OUTPUT_FILE_NAME), exist_ok=True)
-
-    # 3. 创建汇总报告
-    summary_df = create_summary(spectator_df, system_df)
-    
-    # 4. 将所有数据写入一个Excel文件，每个DataFrame在一个单独的sheet中
-    with pd.ExcelWriter(cfg.OUTPUT_FILE_NAME, engine='openpyxl') as writer:
-        summary_df.to_excel(writer, sheet_name='仿真结果汇总', index=False)
-        spectator_df.to_excel(writer, sheet_name='所有观众详细数据', index=False)
-        system_df.to_excel(writer, sheet_name='系统状态监控', index=False)
+    # 3. 创建汇总报告并写入Excel
+    summary_df = write_excel(spectator_df, system_df, cfg.OUTPUT_FILE_NAME)
 
     print(f"仿真完成，结果已保存至 '{cfg.OUTPUT_FILE_NAME}'")
     print("\n仿真结果汇总:")
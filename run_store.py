@@ -0,0 +1,200 @@
+"""
+多次运行结果库
+每次仿真运行把列式结果直接写入独立的运行目录（每列一个 .npy 文件 + manifest.json），
+分析时按需以内存映射方式打开任意运行、任意列，避免在进程间传递和拼接 DataFrame。
+
+目录结构:
+    <root>/
+        <run_id>/
+            manifest.json
+            spectator/000.npy, 001.npy, ...
+            system/000.npy, 001.npy, ...
+"""
+import os
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import config as cfg
+
+MANIFEST_FILE_NAME = "manifest.json"
+TABLES = ("spectator", "system")
+# 写入中的运行先放在以此开头的临时目录中，完成后整体改名为 <run_id>
+TMP_DIR_PREFIX = ".tmp-"
+
+
+def _json_default(value):
+    """manifest 中的 numpy 标量/数组（例如扫描时的 np.arange 取值）转换为 Python 原生类型"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class RunStore:
+    """按运行目录组织的列式结果库"""
+    def __init__(self, root=None):
+        self.root = root if root is not None else cfg.RUN_STORE_DIR
+
+    def run_dir(self, run_id):
+        return os.path.join(self.root, str(run_id))
+
+    # ==========================================================================
+    # 写入
+    # ==========================================================================
+    def exists(self, run_id):
+        """运行是否已完整写入（以 manifest 为准；没有 manifest 的残留目录视为不存在）"""
+        return os.path.isfile(os.path.join(self.run_dir(run_id), MANIFEST_FILE_NAME))
+
+    def write_run(self, run_id, spectator_cols, system_cols, meta=None, overwrite=False):
+        """写入一次运行的结果。先写入临时目录（manifest 最后写入），完成后整体改名为运行目录，
+        中途失败不会留下半成品。run_id 已存在时抛出 FileExistsError，除非显式指定 overwrite=True"""
+        run_dir = self.run_dir(run_id)
+        if self.exists(run_id) and not overwrite:
+            raise FileExistsError(f"结果库中已存在运行 {run_id}: {run_dir}")
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = os.path.join(self.root, f"{TMP_DIR_PREFIX}{run_id}-{os.getpid()}")
+        try:
+            self._write_tables(tmp_dir, run_id, spectator_cols, system_cols, meta)
+            if os.path.exists(run_dir):
+                # overwrite=True 时的旧运行，或没有 manifest 的残留目录
+                shutil.rmtree(run_dir)
+            os.replace(tmp_dir, run_dir)
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+        return str(run_id)
+
+    def _write_tables(self, run_dir, run_id, spectator_cols, system_cols, meta):
+        if os.path.exists(run_dir):
+            shutil.rmtree(run_dir)
+        manifest = {"run_id": str(run_id), "meta": meta or {}, "tables": {}}
+        for table, columns in zip(TABLES, (spectator_cols, system_cols)):
+            table_dir = os.path.join(run_dir, table)
+            os.makedirs(table_dir, exist_ok=True)
+            entries = []
+            rows = 0
+            for index, (name, values) in enumerate(columns.items()):
+                values = np.ascontiguousarray(values)
+                file_name = f"{index:03d}.npy"
+                np.save(os.path.join(table_dir, file_name), values, allow_pickle=False)
+                entries.append({"name": name, "file": f"{table}/{file_name}", "dtype": values.dtype.str})
+                rows = len(values)
+            manifest["tables"][table] = {"rows": rows, "columns": entries}
+
+        with open(os.path.join(run_dir, MANIFEST_FILE_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, default=_json_default)
+
+    # ==========================================================================
+    # 读取
+    # ==========================================================================
+    def run_ids(self):
+        """列出所有已完整写入的运行（按名称排序）"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(TMP_DIR_PREFIX) and os.path.isfile(os.path.join(self.root, name, MANIFEST_FILE_NAME))
+        )
+
+    def manifest(self, run_id):
+        with open(os.path.join(self.run_dir(run_id), MANIFEST_FILE_NAME), encoding="utf-8") as f:
+            return json.load(f)
+
+    def columns(self, run_id, table="spectator"):
+        """返回某次运行某张表的列名列表"""
+        return [entry["name"] for entry in self.manifest(run_id)["tables"][table]["columns"]]
+
+    def open_run(self, run_id, columns=None, table="spectator"):
+        """以只读内存映射方式打开一次运行的若干列，返回 {列名: 数组}，不复制数据"""
+        entries = self.manifest(run_id)["tables"][table]["columns"]
+        by_name = {entry["name"]: entry for entry in entries}
+        names = list(by_name) if columns is None else list(columns)
+        missing = [name for name in names if name not in by_name]
+        if missing:
+            raise KeyError(f"运行 {run_id} 的 {table} 表中不存在列: {missing}")
+        return {
+            name: np.load(os.path.join(self.run_dir(run_id), by_name[name]["file"]), mmap_mode="r")
+            for name in names
+        }
+
+    def open_column(self, run_id, column, table="spectator"):
+        return self.open_run(run_id, [column], table)[column]
+
+    def iter_column(self, column, run_ids=None, table="spectator", where=None):
+        """逐个运行产出 (run_id, 数组)。where 为布尔列名时只保留该列为 True 的行"""
+        for run_id in (self.run_ids() if run_ids is None else run_ids):
+            if where is None:
+                yield run_id, self.open_column(run_id, column, table)
+            else:
+                data = self.open_run(run_id, [column, where], table)
+                yield run_id, data[column][data[where]]
+
+    def gather(self, column, run_ids=None, table="spectator", where=None):
+        """把多次运行的同一列拼接为一个数组（跨运行统计时唯一的一次复制）"""
+        parts = [values for _, values in self.iter_column(column, run_ids, table, where)]
+        if not parts:
+            return np.empty(0)
+        return np.concatenate(parts)
+
+    def quantile(self, column, q, run_ids=None, table="spectator", where=None):
+        """跨运行计算某列的分位数，例如 quantile("安检排队时长", 0.95, where="是否在规定时间内完成")"""
+        values = self.gather(column, run_ids, table, where)
+        if values.size == 0:
+            return np.nan
+        return np.quantile(values, q)
+
+
+# ==============================================================================
+# 多进程重复运行
+# ==============================================================================
+def run_to_store(store_root, run_id, seed=None, overrides=None, verbose=True, sweep_point=None, overwrite=False):
+    """在工作进程中运行一次仿真并直接写入结果库，只返回 run_id。
+    覆盖参数只在本次运行期间生效，结束后恢复调用方的 config（workers == 1 时在调用方进程中运行）"""
+    from simulation import Simulation
+
+    saved_config = cfg.snapshot()
+    try:
+        cfg.apply_overrides(overrides)
+        sim = Simulation(seed=seed, verbose=verbose)
+        sim.run()
+        spectator_cols, system_cols = sim.get_columns()
+    finally:
+        cfg.apply_overrides(saved_config)
+    meta = {
+        "seed": sim.seed,
+        "overrides": overrides or {},
+        "sweep_point": (overrides or {}) if sweep_point is None else sweep_point,
+    }
+    return RunStore(store_root).write_run(run_id, spectator_cols, system_cols, meta, overwrite)
+
+
+def run_replications(num_runs, store_root=None, workers=None, base_seed=None, overrides=None, verbose=True,
+                     prefix="run", sweep_point=None, overwrite=False):
+    """
+    并行运行 num_runs 次重复仿真（种子为 base_seed + i），返回已写入的 run_id 列表。
+    run_id 为 "<prefix>_<i>"；同一结果库中的不同扫描点应使用不同的 prefix，
+    sweep_point（默认为 overrides）记录在每次运行的 manifest meta 中。
+    任一 run_id 已存在时在启动前抛出 FileExistsError，除非显式指定 overwrite=True。
+    """
+    store = RunStore(store_root)
+    base_seed = cfg.RANDOM_SEED if base_seed is None else base_seed
+    run_ids = [f"{prefix}_{i:04d}" for i in range(num_runs)]
+    seeds = [base_seed + i for i in range(num_runs)]
+
+    existing = [run_id for run_id in run_ids if store.exists(run_id)]
+    if existing and not overwrite:
+        raise FileExistsError(f"结果库 {store.root} 中已存在运行 {existing}，请更换 prefix 或指定 overwrite=True")
+
+    args = (overrides, verbose, sweep_point, overwrite)
+    if workers == 1:
+        return [run_to_store(store.root, run_id, seed, *args) for run_id, seed in zip(run_ids, seeds)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_to_store, store.root, run_id, seed, *args)
+            for run_id, seed in zip(run_ids, seeds)
+        ]
+        return [future.result() for future in futures]
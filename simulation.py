@@ -3,7 +3,6 @@
 """
 import simpy
 import numpy as np
-import pandas as pd
 import collections
 
 import config as cfg
@@ -19,8 +18,12 @@ class SpectatorStats:
         self.walk_duration = 0 # 理想步行时长
         self.walk_delay_congestion = 0 # 拥堵导致的步行延迟
         self.walk_delay_random = 0
+        self.security_tent = ""  # 记录安检大棚："north" 或 "south"
+        self.security_queue_start_time = -1
         self.security_queue_wait_time = 0
         self.security_process_time = 0
+        self.security_end_time = -1
+        self.descend_queue_start_time = -1
         self.descend_queue_wait_time = 0
         self.descend_process_time = 0
         self.descend_method = ""  # 记录下行方式："escalator" 或 "stairs"
@@ -40,8 +43,12 @@ class SpectatorStats:
             "理想步行时长": self.walk_duration,
             "拥堵延迟": self.walk_delay_congestion,
             "随机扰动延迟": self.walk_delay_random,
+            "安检大棚": self.security_tent,
+            "安检排队开始时间": self.security_queue_start_time,
             "安检排队时长": self.security_queue_wait_time,
             "安检处理时长": self.security_process_time,
+            "安检完成时间": self.security_end_time,
+            "下楼排队开始时间": self.descend_queue_start_time,
             "下楼排队时长": self.descend_queue_wait_time,
             "下楼过程时长": self.descend_process_time,
             "下行方式": self.descend_method,
@@ -51,11 +58,21 @@ class SpectatorStats:
         }
 
 
+def records_to_columns(records):
+    """将记录字典列表转换为 {列名: numpy数组} 的列式结构，列顺序与记录字段顺序一致"""
+    if not records:
+        return {}
+    names = list(records[0].keys())
+    return {name: np.asarray([record[name] for record in records]) for name in names}
+
+
 class Simulation:
     """仿真主类"""
-    def __init__(self):
+    def __init__(self, seed=None, verbose=True):
         self.env = simpy.Environment()
-        self.random_state = np.random.RandomState(cfg.RANDOM_SEED)
+        self.seed = cfg.RANDOM_SEED if seed is None else seed
+        self.verbose = verbose  # 是否打印运行进度（命令行批量运行时关闭，保持标准输出可被机器解析）
+        self.random_state = np.random.RandomState(self.seed)
         
         # 定义资源
         self.security_lanes = [simpy.Resource(self.env, capacity=1) for _ in range(cfg.TOTAL_SECURITY_LANES)]
@@ -117,10 +134,11 @@ class Simulation:
 
         return max(speed, cfg.MIN_WALKING_SPEED_MPS)
 
-    def spectator_process(self, spectator_id, group_size, path_name):
-        """单个观众的完整仿真流程"""
-        stats = SpectatorStats(spectator_id, self.env.now, group_size, path_name)
-        self.spectator_stats.append(stats)
+    def spectator_process(self, spectator_id, group_size, path_name, stats=None):
+        """单个观众的完整仿真流程（stats 为已提前建立的记录时沿用该记录）"""
+        if stats is None:
+            stats = SpectatorStats(spectator_id, self.env.now, group_size, path_name)
+            self.spectator_stats.append(stats)
 
         # 1. 交通延迟
         stats.transport_delay = self.get_transport_delay()
@@ -150,11 +168,13 @@ class Simulation:
 
         # 3. 安检过程
         security_queue_start_time = self.env.now
+        stats.security_queue_start_time = security_queue_start_time
         
         # 3.1 大棚选择 (选择总排队人数较少的大棚)
         north_queue = sum(len(res.queue) for res in self.north_lanes)
         south_queue = sum(len(res.queue) for res in self.south_lanes)
         chosen_tent_lanes = self.north_lanes if north_queue <= south_queue else self.south_lanes
+        stats.security_tent = "north" if chosen_tent_lanes is self.north_lanes else "south"
         
         # 3.2 通道选择 (选择该大棚内排队人数最少的通道)
         chosen_lane = min(chosen_tent_lanes, key=lambda r: len(r.queue))
@@ -178,6 +198,7 @@ class Simulation:
             yield self.env.timeout(process_time * delay_factor)
             
             stats.security_process_time = self.env.now - security_process_start_time
+            stats.security_end_time = self.env.now
 
             # 模拟通道故障
             if self.random_state.rand() < cfg.LANE_FAILURE_PROB_PER_PERSON:
@@ -189,6 +210,7 @@ class Simulation:
 
         # 4. 下行方式选择
         descend_queue_start_time = self.env.now
+        stats.descend_queue_start_time = descend_queue_start_time
         
         use_escalator_prob = cfg.DESCEND_INITIAL_PROBS['escalator']
         if len(self.escalator.queue) > cfg.ESCALATOR_QUEUE_THRESHOLD_FOR_ADJUST:
@@ -217,7 +239,7 @@ class Simulation:
         stats.finish_time = self.env.now
         stats.is_finished = True
 
-        if spectator_id % cfg.SPECTATOR_LOG_INTERVAL == 0:
+        if self.verbose and spectator_id % cfg.SPECTATOR_LOG_INTERVAL == 0:
             print(f"观众 {spectator_id} 在 {self.env.now:.2f} 秒完成进站。")
 
     def setup(self):
@@ -281,13 +303,30 @@ class Simulation:
 
     def run(self):
         """运行仿真"""
-        print("仿真开始...")
+        if self.verbose:
+            print("仿真开始...")
         self.setup()
         self.env.run(until=cfg.SIMULATION_DURATION_SECONDS)
-        print("仿真结束。")
+        if self.verbose:
+            print("仿真结束。")
+
+    def get_columns(self):
+        """将统计数据转换为列式 numpy 数组（不依赖 pandas），供结果库和分析模块使用"""
+        spectator_cols = records_to_columns([s.to_dict() for s in self.spectator_stats])
+        system_cols = records_to_columns(self.system_state_log)
+        return spectator_cols, system_cols
+
+    def get_kpis(self):
+        """计算本次运行的机器可读 KPI"""
+        from analytics import compute_kpis
+
+        return compute_kpis(*self.get_columns())
 
     def get_results(self):
         """将统计数据转换为DataFrame"""
-        spectator_df = pd.DataFrame([s.to_dict() for s in self.spectator_stats])
-        system_df = pd.DataFrame(self.system_state_log)
+        import pandas as pd
+
+        spectator_cols, system_cols = self.get_columns()
+        spectator_df = pd.DataFrame(spectator_cols)
+        system_df = pd.DataFrame(system_cols)
         return spectator_df, system_df 
\ No newline at end of file
@@ -0,0 +1,397 @@
+"""
+多闸口场馆模型
+场馆由多个闸口实例组成，每个闸口是一个独立的 Simulation（自己的路径、大棚、扶梯和楼梯），
+使用 config.GATES 中该闸口的参数覆盖。到达观众按 share 比例分配到各闸口。
+
+- 闸口之间无改道关系时，各闸口在独立工作进程中完整运行，结束后合并结果。
+- 配置了 config.GATE_REROUTE_LINKS 时，闸口分配到至多 VENUE_WORKERS 个常驻工作进程，按
+  GATE_EXCHANGE_INTERVAL_S 同步推进仿真时钟（各闸口只推进到自己的仿真时长）；每个周期结束时交换排队状态，
+  由协调进程决定下一周期各闸口新到达群组的改道目标和概率（粗粒度耦合）。
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import config as cfg
+from simulation import Simulation, SpectatorStats
+from analytics import compute_kpis
+
+GATE_COLUMN = "闸口"
+REROUTE_ORIGIN_COLUMN = "改道来源闸口"
+
+
+class GateSimulation(Simulation):
+    """单个闸口的仿真，支持把新到达群组改道到其他闸口以及接收其他闸口改道来的群组"""
+    def __init__(self, gate_name, seed=None, verbose=False):
+        super().__init__(seed=seed, verbose=verbose)
+        self.gate_name = gate_name
+        self.reroute_targets = {}  # 最近一次状态交换后的改道目标 {闸口: 概率}
+        self.outgoing_groups = []  # 本周期改道离开的群组
+        self.rerouted_out = 0
+        self.rerouted_in = {}  # 改道来的观众 {ID: 来源闸口}
+        self.next_spectator_id = 0
+
+    def setup(self):
+        super().setup()
+        self.next_spectator_id = cfg.TOTAL_SPECTATORS
+
+    def choose_reroute_target(self):
+        """根据最近一次交换的状态决定新到达群组是否改道，返回目标闸口或 None"""
+        if not self.reroute_targets:
+            return None
+        draw = self.random_state.rand()
+        for target, prob in self.reroute_targets.items():
+            if draw < prob:
+                return target
+            draw -= prob
+        return None
+
+    def group_arrival(self, start_id, arrival_time, group_size, path_name):
+        """一个群组的到达事件（到达时可能改道）"""
+        yield self.env.timeout(arrival_time)
+        target = self.choose_reroute_target()
+        if target is not None:
+            self.outgoing_groups.append({
+                "origin": self.gate_name,
+                "target": target,
+                "arrival_time": self.env.now,
+                "group_size": int(group_size),
+            })
+            self.rerouted_out += int(group_size)
+            return
+        yield from super().group_arrival(start_id, 0, group_size, path_name)
+
+    def inject_group(self, group):
+        """
+        接收其他闸口改道来的群组，步行 GATE_REROUTE_DELAY_S 后在本闸口开始后续流程。
+        观众记录在接收时立即建立（到达时间为最初到达原闸口的时间），
+        仿真结束时仍在途中的观众因此也会以未完成状态出现在结果中。
+        """
+        start_id = self.next_spectator_id
+        self.next_spectator_id += group["group_size"]
+        path_name = self.assign_path()
+        members = []
+        for spectator_id in range(start_id, start_id + group["group_size"]):
+            stats = SpectatorStats(spectator_id, group["arrival_time"], group["group_size"], path_name)
+            self.spectator_stats.append(stats)
+            self.rerouted_in[spectator_id] = group["origin"]
+            members.append(stats)
+        arrival_time = group["arrival_time"] + cfg.GATE_REROUTE_DELAY_S
+        self.env.process(self.rerouted_group_arrival(members, max(0, arrival_time - self.env.now)))
+
+    def rerouted_group_arrival(self, members, delay):
+        """改道群组步行到达本闸口后，成员同时开始后续流程"""
+        yield self.env.timeout(delay)
+        for stats in members:
+            self.env.process(self.spectator_process(stats.id, stats.group_size, stats.path_name, stats=stats))
+
+    def pop_outgoing_groups(self):
+        groups, self.outgoing_groups = self.outgoing_groups, []
+        return groups
+
+    def queue_state(self):
+        """交换给协调进程的排队状态"""
+        security_queue = sum(len(r.queue) for r in self.security_lanes)
+        return {
+            "security_queue": security_queue,
+            "load": security_queue / cfg.TOTAL_SECURITY_LANES if cfg.TOTAL_SECURITY_LANES > 0 else 0,
+        }
+
+    def get_columns(self):
+        """在基础列之上标记改道来源闸口"""
+        spectator_cols, system_cols = super().get_columns()
+        if spectator_cols:
+            spectator_cols[REROUTE_ORIGIN_COLUMN] = np.array(
+                [self.rerouted_in.get(i, "") for i in spectator_cols["ID"].tolist()]
+            )
+        return spectator_cols, system_cols
+
+    def get_kpis(self):
+        """闸口级 KPI，完成率以本闸口负责的人数（含改道到达及途中观众，不含改道离开者）为分母"""
+        kpis = super().get_kpis()
+        served = len(self.spectator_stats)
+        kpis["completion_rate"] = kpis["finished"] / served if served > 0 else 0.0
+        kpis["rerouted_out"] = self.rerouted_out
+        kpis["rerouted_in"] = len(self.rerouted_in)
+        return kpis
+
+    def result(self):
+        """供协调进程合并的闸口结果"""
+        spectator_cols, system_cols = self.get_columns()
+        return {
+            "gate": self.gate_name,
+            "spectator": spectator_cols,
+            "system": system_cols,
+            "kpis": self.get_kpis(),
+            "lanes": cfg.TOTAL_SECURITY_LANES,
+            "escalator_capacity": cfg.ESCALATOR_PHYSICAL_CAPACITY,
+        }
+
+
+def build_gate(gate_name, snapshot, gate_overrides, num_spectators, seed):
+    """在工作进程中按主进程配置快照 + 闸口覆盖参数构建闸口仿真"""
+    cfg.apply_overrides(snapshot)
+    cfg.apply_overrides({**gate_overrides, "TOTAL_SPECTATORS": num_spectators})
+    return GateSimulation(gate_name, seed=seed)
+
+
+def run_gate(gate_name, snapshot, gate_overrides, num_spectators, seed):
+    """独立闸口：在工作进程中完整运行并返回结果"""
+    sim = build_gate(gate_name, snapshot, gate_overrides, num_spectators, seed)
+    sim.run()
+    return sim.result()
+
+
+def gate_worker(conn, tasks):
+    """
+    耦合闸口：常驻工作进程，负责一个或多个闸口，按协调进程的指令分周期推进仿真。
+    同一进程内各闸口的参数不同，因此操作某个闸口前先把 config 切换为该闸口的快照。
+    """
+    gates = {}
+    for task in tasks:
+        sim = build_gate(*task)
+        sim.setup()
+        sim.config = cfg.snapshot()
+        gates[sim.gate_name] = sim
+    # 各闸口的仿真时长可能被各自的覆盖参数修改，先报告给协调进程
+    conn.send({name: sim.config["SIMULATION_DURATION_SECONDS"] for name, sim in gates.items()})
+
+    while True:
+        command, payload = conn.recv()
+        replies = {}
+        for name, sim in gates.items():
+            cfg.apply_overrides(sim.config)
+            # 上一周期（finish 时为最后一个周期）其他闸口改道来的群组
+            for group in payload[name]["incoming_groups"]:
+                sim.inject_group(group)
+            if command == "advance":
+                sim.reroute_targets = payload[name]["reroute_targets"]
+                if payload[name]["until"] > sim.env.now:
+                    sim.env.run(until=payload[name]["until"])
+                replies[name] = (sim.queue_state(), sim.pop_outgoing_groups())
+            else:
+                replies[name] = sim.result()
+        conn.send(replies)
+        if command == "finish":
+            break
+    conn.close()
+
+
+def decide_reroute_targets(states, links):
+    """
+    根据各闸口上一周期末的排队状态决定改道规则：负载超过阈值的闸口，
+    把新到达群组按 GATE_REROUTE_PROB 改道到可达闸口中负载最低且低于自身的那个。
+    """
+    targets = {}
+    for gate, state in states.items():
+        targets[gate] = {}
+        if state["load"] <= cfg.GATE_REROUTE_LOAD_THRESHOLD:
+            continue
+        candidates = [name for name in links.get(gate, []) if name in states]
+        if not candidates:
+            continue
+        best = min(candidates, key=lambda name: states[name]["load"])
+        if states[best]["load"] < state["load"]:
+            targets[gate] = {best: cfg.GATE_REROUTE_PROB}
+    return targets
+
+
+def merge_gate_columns(gate_results, table):
+    """按闸口顺序拼接各闸口的列，首列为闸口名；某闸口缺少的列以 NaN 填充"""
+    parts = [(result["gate"], result[table]) for result in gate_results if result[table]]
+    if not parts:
+        return {}
+
+    names = list(dict.fromkeys(name for _, columns in parts for name in columns))
+    rows = [len(next(iter(columns.values()))) for _, columns in parts]
+
+    merged = {GATE_COLUMN: np.concatenate([np.full(n, gate) for (gate, _), n in zip(parts, rows)])}
+    for name in names:
+        merged[name] = np.concatenate([
+            columns[name] if name in columns else np.full(n, np.nan)
+            for (_, columns), n in zip(parts, rows)
+        ])
+    return merged
+
+
+def validate_gates(gates=None, links=None):
+    """
+    检查闸口配置：覆盖参数名未知时抛出 KeyError，share 或交换周期不合法时抛出 ValueError，
+    错误信息中注明闸口名。Venue 构造时调用，命令行在运行前调用
+    """
+    gates = cfg.GATES if gates is None else gates
+    links = cfg.GATE_REROUTE_LINKS if links is None else links
+    for name, gate in gates.items():
+        try:
+            cfg.validate_overrides(gate.get("overrides", {}))
+        except KeyError as e:
+            raise KeyError(f"闸口 {name}: {e.args[0]}") from None
+        share = gate.get("share", 1.0)
+        if isinstance(share, bool) or not isinstance(share, (int, float, np.number)) or not share >= 0:
+            raise ValueError(f"闸口 {name}: share 必须是非负数，当前为 {share!r}")
+    if sum(gate.get("share", 1.0) for gate in gates.values()) <= 0:
+        raise ValueError(f"闸口 {list(gates)} 的 share 之和必须大于 0")
+    if any(links.get(name) for name in gates) and not cfg.GATE_EXCHANGE_INTERVAL_S > 0:
+        raise ValueError(f"GATE_EXCHANGE_INTERVAL_S 必须大于 0，当前为 {cfg.GATE_EXCHANGE_INTERVAL_S!r}")
+
+
+class Venue:
+    """场馆级模型：多个闸口实例，独立闸口并行运行，可改道的闸口通过周期性状态交换耦合"""
+    def __init__(self, seed=None, verbose=True, gates=None, links=None, workers=None):
+        self.seed = cfg.RANDOM_SEED if seed is None else seed
+        self.verbose = verbose
+        self.gates = cfg.GATES if gates is None else gates
+        self.links = cfg.GATE_REROUTE_LINKS if links is None else links
+        self.workers = cfg.VENUE_WORKERS if workers is None else workers
+        # 在启动任何工作进程之前检查各闸口参数
+        validate_gates(self.gates, self.links)
+        self.random_state = np.random.RandomState(self.seed)
+        self.gate_results = []
+
+    def assign_spectators(self):
+        """闸口分配规则：每名到达观众按 share 比例独立选择闸口，返回 {闸口: 人数}"""
+        names = list(self.gates)
+        shares = np.array([self.gates[name].get("share", 1.0) for name in names], dtype=float)
+        counts = self.random_state.multinomial(cfg.TOTAL_SPECTATORS, shares / shares.sum())
+        return dict(zip(names, counts.tolist()))
+
+    def gate_seeds(self):
+        """为每个闸口派生互不相关的随机种子"""
+        children = np.random.SeedSequence(self.seed).spawn(len(self.gates))
+        return dict(zip(self.gates, (int(child.generate_state(1)[0]) for child in children)))
+
+    def run(self):
+        """运行场馆仿真"""
+        if self.verbose:
+            print(f"场馆仿真开始（{len(self.gates)} 个闸口）...")
+        counts = self.assign_spectators()
+        seeds = self.gate_seeds()
+        # 传给工作进程的配置快照，保证与主进程一致（与进程启动方式无关）
+        snapshot = cfg.snapshot()
+        tasks = [
+            (name, snapshot, self.gates[name].get("overrides", {}), counts[name], seeds[name])
+            for name in self.gates
+        ]
+        try:
+            if any(self.links.get(name) for name in self.gates):
+                self.gate_results = self.run_coupled(tasks)
+            else:
+                self.gate_results = self.run_independent(tasks)
+        finally:
+            # 单进程运行时闸口参数会写入本进程的 config，运行结束后恢复
+            cfg.apply_overrides(snapshot)
+
+        total_rows = sum(len(result["spectator"].get("ID", ())) for result in self.gate_results)
+        if total_rows != cfg.TOTAL_SPECTATORS:
+            raise RuntimeError(f"场馆结果观众数 {total_rows} 与 TOTAL_SPECTATORS={cfg.TOTAL_SPECTATORS} 不一致")
+        if self.verbose:
+            print("场馆仿真结束。")
+
+    def run_independent(self, tasks):
+        """各闸口互不影响：按工作进程数并行完整运行"""
+        workers = self.workers or os.cpu_count() or 1
+        if workers == 1 or len(tasks) == 1:
+            return [run_gate(*task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            futures = [executor.submit(run_gate, *task) for task in tasks]
+            return [future.result() for future in futures]
+
+    def run_coupled(self, tasks):
+        """
+        存在改道关系：闸口分配到至多 workers 个常驻进程（每个进程负责一个或多个闸口），
+        按交换周期同步推进并交换排队状态
+        """
+        workers = min(self.workers or os.cpu_count() or 1, len(tasks))
+        assignments = [tasks[i::workers] for i in range(workers)]
+        connections = []
+        processes = []
+        for chunk in assignments:
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=gate_worker, args=(child_conn, chunk))
+            process.start()
+            child_conn.close()
+            connections.append(parent_conn)
+            processes.append(process)
+
+        names = [task[0] for task in tasks]
+        try:
+            end_times = {}
+            for conn in connections:
+                end_times.update(conn.recv())
+            # 同步时钟推进到最晚结束的闸口，每个闸口只推进到自己的结束时间
+            venue_end = max(end_times.values())
+            reroute_targets = {name: {} for name in names}
+            incoming_groups = {name: [] for name in names}
+            now = 0
+            while now < venue_end:
+                now = min(now + cfg.GATE_EXCHANGE_INTERVAL_S, venue_end)
+                for conn, chunk in zip(connections, assignments):
+                    conn.send(("advance", {
+                        task[0]: {
+                            "until": min(now, end_times[task[0]]),
+                            "reroute_targets": reroute_targets[task[0]],
+                            "incoming_groups": incoming_groups[task[0]],
+                        }
+                        for task in chunk
+                    }))
+
+                states = {}
+                incoming_groups = {name: [] for name in names}
+                for conn in connections:
+                    for name, (state, outgoing) in conn.recv().items():
+                        states[name] = state
+                        for group in outgoing:
+                            incoming_groups[group["target"]].append(group)
+                # 已结束的闸口不再有新到达，也不再接收改道群组
+                open_states = {name: state for name, state in states.items() if end_times[name] > now}
+                reroute_targets = {name: {} for name in names}
+                reroute_targets.update(decide_reroute_targets(open_states, self.links))
+
+            # 最后一个周期改道离开的群组随 finish 指令送达目标闸口
+            for conn, chunk in zip(connections, assignments):
+                conn.send(("finish", {task[0]: {"incoming_groups": incoming_groups[task[0]]} for task in chunk}))
+            results = {}
+            for conn in connections:
+                results.update(conn.recv())
+            return [results[name] for name in names]
+        finally:
+            # 关闭管道并终止仍在运行的工作进程，避免某个闸口进程异常退出时其余进程阻塞在 recv()
+            for conn in connections:
+                conn.close()
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+    def get_columns(self):
+        """合并后的列式结果，观众以 (闸口, ID) 唯一标识"""
+        return merge_gate_columns(self.gate_results, "spectator"), merge_gate_columns(self.gate_results, "system")
+
+    def get_results(self):
+        import pandas as pd
+
+        spectator_cols, system_cols = self.get_columns()
+        return pd.DataFrame(spectator_cols), pd.DataFrame(system_cols)
+
+    def get_kpis(self):
+        """场馆级 KPI：观众类指标基于合并后的观众数据，资源类指标由各闸口汇总，并附各闸口 KPI"""
+        spectator_cols, _ = self.get_columns()
+        kpis = compute_kpis(spectator_cols, {})
+
+        gate_kpis = {result["gate"]: result["kpis"] for result in self.gate_results}
+        for name in ("north_max_queue", "south_max_queue", "escalator_max_queue"):
+            kpis[name] = max((gate[name] for gate in gate_kpis.values()), default=0.0)
+
+        lanes = sum(result["lanes"] for result in self.gate_results)
+        capacity = sum(result["escalator_capacity"] for result in self.gate_results)
+        kpis["security_lane_utilization_pct"] = sum(
+            result["kpis"]["security_lane_utilization_pct"] * result["lanes"] for result in self.gate_results
+        ) / lanes if lanes else 0.0
+        kpis["escalator_utilization_pct"] = sum(
+            result["kpis"]["escalator_utilization_pct"] * result["escalator_capacity"] for result in self.gate_results
+        ) / capacity if capacity else 0.0
+        kpis["rerouted"] = sum(gate["rerouted_out"] for gate in gate_kpis.values())
+        kpis["gates"] = gate_kpis
+        return kpis